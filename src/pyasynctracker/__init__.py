@@ -1,2 +1,2 @@
 from .scraper import scrape_info_hashes, batch_scrape_info_hashes
-from .utils import find_max_seeders
+from .utils import find_max_seeders, run
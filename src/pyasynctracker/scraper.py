@@ -1,18 +1,94 @@
 import asyncio
-import binascii
+import ipaddress
 import logging
 import random
+import socket
 import struct
+import time
 from collections import defaultdict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from urllib import parse
 
 import aiodns
 import aiohttp
 import bencodepy
+from aiohttp.resolver import AsyncResolver
+from fastbencode import bdecode
+
+DNS_CACHE_TTL = 300  # Seconds a resolved tracker hostname is reused, by both HTTP and UDP scrapes
+MAX_HTTP_RESPONSE_SIZE = 4 * 1024 * 1024  # Largest scrape response body accepted from a tracker
+MAX_CONNECTIONS_PER_HOST = 64  # Concurrent scrapes allowed against a single tracker host
+CONNECTION_ID_TTL = 60  # Seconds a UDP tracker connection ID may be reused (BEP 15)
+
+# Precompiled BEP 15 packet layouts
+_REQUEST_HEADER = struct.Struct("!qII")  # connection_id, action, transaction_id
+_RESPONSE_HEADER = struct.Struct("!II")  # action, transaction_id
+_CONNECT_RESPONSE = struct.Struct("!IIq")  # action, transaction_id, connection_id
+_SCRAPE_STATS = struct.Struct("!iii")  # seeders, completed, leechers
+
+_RESOLVER: aiodns.DNSResolver | None = None
+_DNS_CACHE: dict[str, tuple[str, float]] = {}
+_CONN_ID_CACHE: dict[tuple[str, int], tuple[int, float]] = {}
+_HOST_SEMAPHORES: dict[tuple[str, str], list] | None = None  # Host -> [semaphore, scrapes using it]
+_HOST_SEMAPHORES_LOOP: asyncio.AbstractEventLoop | None = None
+
+
+class CachingResolver(AsyncResolver):
+    """
+    aiodns-backed resolver for aiohttp that records the IPv4 address of each HTTP tracker host in the
+    UDP scraper's DNS cache, so UDP trackers on the same host skip their lookup.
+
+    HTTP lookups themselves are not answered from that cache (the connector asks for all address
+    families and keeps its own ttl_dns_cache), so the sharing only goes from HTTP to UDP.
+    """
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET):
+        hosts = await super().resolve(host, port, family)
+        for resolved in hosts:
+            if resolved["family"] == socket.AF_INET:
+                _DNS_CACHE[host] = (resolved["host"], time.monotonic())
+                break
+        return hosts
+
+
+@asynccontextmanager
+async def create_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """
+    Create an aiohttp session with a pooled connector shared by all HTTP tracker requests.
+
+    The connector does not own a resolver passed to it, so the resolver is closed here along with the session.
+
+    Yields:
+        aiohttp.ClientSession: A session that keeps connections alive and caches DNS lookups.
+    """
+    resolver = CachingResolver()
+    try:
+        connector = aiohttp.TCPConnector(
+            limit=256,
+            limit_per_host=MAX_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            resolver=resolver,
+        )
+        async with aiohttp.ClientSession(connector=connector) as session:
+            yield session
+    finally:
+        await resolver.close()
+
+
+async def _return_exceptions(coro):
+    # Await a single coroutine the way asyncio.gather(..., return_exceptions=True) would
+    try:
+        return await coro
+    except Exception as e:
+        return e
 
 
 async def scrape_info_hashes(
-        info_hashes: list[str], tracker_list: list[str], timeout: int = 10
+        info_hashes: list[str],
+        tracker_list: list[str],
+        timeout: int = 10,
+        session: aiohttp.ClientSession | None = None,
 ) -> dict[str, list[dict]]:
     """
     Asynchronously scrape seeders, peers, and completion counts for given info hashes from specified trackers.
@@ -21,25 +97,33 @@ async def scrape_info_hashes(
         info_hashes (list[str]): A list of info hashes to scrape.
         tracker_list (list[str]): A list of tracker URLs to use for scraping.
         timeout (int): Timeout in seconds for each request.
+        session (aiohttp.ClientSession | None): Session used for HTTP trackers. A new one is created
+                                                 and closed on return if not provided.
 
     Returns:
         dict[str, list[dict]]: A dictionary with info hashes as keys and lists of dictionaries containing
                                tracker data as values.
     """
-    tasks = [scrape_tracker(tracker, info_hashes, timeout) for tracker in tracker_list]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    aggregated_results = {}
+    if session is None:
+        async with create_session() as session:
+            return await scrape_info_hashes(info_hashes, tracker_list, timeout, session)
+
+    if len(tracker_list) == 1:
+        # No need for a task and gathering future when there is a single tracker
+        results = [await _return_exceptions(scrape_tracker(tracker_list[0], info_hashes, timeout, session))]
+    else:
+        tasks = [scrape_tracker(tracker, info_hashes, timeout, session) for tracker in tracker_list]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    aggregated_results = defaultdict(list)
 
     for result in results:
         if isinstance(result, dict):
             for hash_key, data in result.items():
-                if hash_key not in aggregated_results:
-                    aggregated_results[hash_key] = []
                 aggregated_results[hash_key].append(data)
         else:
             logging.error(f"Error in scraping tracker {result}")
 
-    return aggregated_results
+    return dict(aggregated_results)
 
 
 async def batch_scrape_info_hashes(
@@ -59,47 +143,126 @@ async def batch_scrape_info_hashes(
     """
     # Dictionary to hold sets of tracker URLs and their corresponding info hashes
     tracker_sets_to_hashes = defaultdict(set)
+    # Identical tracker lists are common across torrents, so build each frozenset only once
+    tracker_set_cache: dict[tuple[str, ...], frozenset[str]] = {}
     for info_hash, trackers in data_list:
-        tracker_set = frozenset(trackers)
+        key = tuple(trackers)
+        tracker_set = tracker_set_cache.get(key)
+        if tracker_set is None:
+            tracker_set = tracker_set_cache[key] = frozenset(trackers)
         tracker_sets_to_hashes[tracker_set].add(info_hash)
 
-    all_results = {}
-    scrape_tasks = []
+    all_results = defaultdict(list)
 
-    for trackers, info_hashes in tracker_sets_to_hashes.items():
-        task = scrape_info_hashes(list(info_hashes), list(trackers), timeout)
-        scrape_tasks.append(task)
+    async with create_session() as session:
+        scrape_tasks = []
 
-    scrape_results = await asyncio.gather(*scrape_tasks, return_exceptions=True)
+        for trackers, info_hashes in tracker_sets_to_hashes.items():
+            task = scrape_info_hashes(list(info_hashes), list(trackers), timeout, session)
+            scrape_tasks.append(task)
+
+        scrape_results = await asyncio.gather(*scrape_tasks, return_exceptions=True)
 
     for results in scrape_results:
         if isinstance(results, dict):
             for hash_key, result in results.items():
-                if hash_key not in all_results:
-                    all_results[hash_key] = []
                 all_results[hash_key].extend(result)
         else:
             logging.error(f"Error in scraping process: {results}")
 
-    return all_results
+    return dict(all_results)
 
 
-async def scrape_tracker(tracker: str, info_hashes: list[str], timeout: int):
+async def scrape_tracker(
+        tracker: str, info_hashes: list[str], timeout: int, session: aiohttp.ClientSession | None = None
+):
     parsed = parse.urlparse(tracker)
     if parsed.scheme == "udp":
-        return await scrape_udp(parsed, info_hashes, timeout)
+        async with _host_semaphore(parsed):
+            return await scrape_udp(parsed, info_hashes, timeout)
     elif parsed.scheme in ["http", "https"]:
-        return await scrape_http(parsed, info_hashes, timeout)
+        async with _host_semaphore(parsed):
+            return await scrape_http(parsed, info_hashes, timeout, session)
     else:
         raise ValueError(f"Unsupported scheme: {parsed.scheme} for {tracker}")
 
 
-async def scrape_http(parsed_tracker, info_hashes: list[str], timeout: int):
-    qs = [
-        ("info_hash", binascii.a2b_hex(info_hash.encode("utf-8")))
-        for info_hash in info_hashes
-    ]
-    qs = parse.urlencode(qs, doseq=True)
+@asynccontextmanager
+async def _host_semaphore(parsed_tracker: parse.ParseResult) -> AsyncIterator[None]:
+    """
+    Hold one of the MAX_CONNECTIONS_PER_HOST slots for the tracker's host while the block runs.
+
+    Each semaphore is dropped as soon as no scrape is holding or waiting on it, so the table only
+    ever contains hosts that are currently being scraped.
+    """
+    global _HOST_SEMAPHORES, _HOST_SEMAPHORES_LOOP
+
+    # Semaphores are bound to the loop they are first used on
+    loop = asyncio.get_running_loop()
+    if _HOST_SEMAPHORES is None or _HOST_SEMAPHORES_LOOP is not loop:
+        _HOST_SEMAPHORES = {}
+        _HOST_SEMAPHORES_LOOP = loop
+    semaphores = _HOST_SEMAPHORES
+    key = (parsed_tracker.scheme, parsed_tracker.hostname)
+
+    entry = semaphores.get(key)
+    if entry is None:
+        entry = semaphores[key] = [asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST), 0]
+    entry[1] += 1  # Scrapes holding or waiting on this semaphore
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and semaphores.get(key) is entry:
+            del semaphores[key]
+
+
+def _cache_get(cache: dict, key, ttl: float):
+    """Return the value cached under key if it is younger than ttl seconds, evicting it once expired."""
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    if time.monotonic() - cached[1] < ttl:
+        return cached[0]
+    del cache[key]
+    return None
+
+
+async def read_limited(response: aiohttp.ClientResponse, max_size: int) -> bytes:
+    """
+    Read a response body, refusing to buffer more than max_size bytes.
+
+    Args:
+        response (aiohttp.ClientResponse): The response to read.
+        max_size (int): Maximum number of body bytes to accept.
+
+    Returns:
+        bytes: The response body.
+    """
+    if response.content_length is not None and response.content_length > max_size:
+        raise RuntimeError(f"Response too large: {response.content_length} bytes")
+
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        size += len(chunk)
+        if size > max_size:
+            raise RuntimeError(f"Response too large: more than {max_size} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def scrape_http(
+        parsed_tracker, info_hashes: list[str], timeout: int, session: aiohttp.ClientSession | None = None
+):
+    if session is None:
+        async with create_session() as session:
+            return await scrape_http(parsed_tracker, info_hashes, timeout, session)
+
+    # Trackers such as opentracker echo hashes in request order; sorted keeps the reply canonical bencode
+    hash_bytes = sorted(bytes.fromhex(info_hash) for info_hash in info_hashes)
+    qs = parse.urlencode([("info_hash", byte_hash) for byte_hash in hash_bytes], doseq=True)
     url = parse.urlunsplit(
         (
             parsed_tracker.scheme,
@@ -110,91 +273,113 @@ async def scrape_http(parsed_tracker, info_hashes: list[str], timeout: int):
         )
     )
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, timeout=timeout) as response:
-                if response.status != 200:
-                    raise RuntimeError(f"{response.status} status code returned")
-                content = await response.read()
+    try:
+        client_timeout = aiohttp.ClientTimeout(total=timeout, sock_read=timeout)
+        async with session.get(url, timeout=client_timeout) as response:
+            if response.status != 200:
+                raise RuntimeError(f"{response.status} status code returned")
+            content = await read_limited(response, MAX_HTTP_RESPONSE_SIZE)
+            try:
+                decoded_dict = bdecode(content)
+            except ValueError as e:
+                # fastbencode rejects dicts whose keys are not sorted, which some trackers send
+                if "disordered" not in str(e):
+                    raise
                 decoded_dict = bencodepy.decode(content)
-                result = {}
-                for byte_hash, stats in decoded_dict[b"files"].items():
-                    readable_hash = binascii.b2a_hex(byte_hash).decode("utf-8")
-                    if readable_hash in [
-                        binascii.b2a_hex(
-                            binascii.a2b_hex(info_hash.encode("utf-8"))
-                        ).decode("utf-8")
-                        for info_hash in info_hashes
-                    ]:
-                        result[readable_hash] = {
-                            "tracker_url": parsed_tracker.geturl(),
-                            "seeders": stats[b"complete"],
-                            "peers": stats[b"incomplete"],
-                            "complete": stats[b"downloaded"],
-                        }
-                return result
-        except Exception as e:
-            logging.error(f"Error occurred for {parsed_tracker.geturl()}: {e}")
-            return {}
+            files = decoded_dict[b"files"]
+            tracker_url = parsed_tracker.geturl()
+            # Look up only the requested hashes; trackers may return many unrelated entries
+            return {
+                byte_hash.hex(): {
+                    "tracker_url": tracker_url,
+                    "seeders": stats[b"complete"],
+                    "peers": stats[b"incomplete"],
+                    "complete": stats[b"downloaded"],
+                }
+                for byte_hash in frozenset(hash_bytes)
+                if (stats := files.get(byte_hash)) is not None
+            }
+    except Exception as e:
+        logging.error(f"Error occurred for {parsed_tracker.geturl()}: {e}")
+        return {}
 
 
 class UDPTrackerClientProtocol(asyncio.DatagramProtocol):
-    def __init__(self, message, response_handler, error_handler):
-        self.message = message
-        self.response_handler = response_handler
+    def __init__(self, error_handler):
         self.error_handler = error_handler
         self.transport = None
+        self.pending: dict[int, asyncio.Future] = {}  # Transaction ID -> future awaiting its response
 
     def connection_made(self, transport):
         self.transport = transport
-        self.transport.sendto(self.message)
+
+    def request(self, message, transaction_id) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[transaction_id] = future
+        self.transport.sendto(message)
+        return future
 
     def datagram_received(self, data, addr):
-        asyncio.create_task(self.response_handler(data))
+        if len(data) < _RESPONSE_HEADER.size:
+            return
+        _, trans_id = _RESPONSE_HEADER.unpack_from(data)
+        future = self.pending.pop(trans_id, None)
+        if future is not None and not future.done():
+            future.set_result(data)
 
     def error_received(self, exc):
         self.error_handler(exc)
+        self._fail_pending(exc)
 
     def connection_lost(self, exc):
         if exc:
             self.error_handler(exc)
+        self._fail_pending(exc)
 
+    def _fail_pending(self, exc):
+        for future in self.pending.values():
+            if future.done():
+                continue
+            if exc is None:
+                future.cancel()
+            else:
+                future.set_exception(exc)
+        self.pending.clear()
+
+
+async def _resolve(hostname: str) -> str:
+    global _RESOLVER
 
-async def resolve_hostname(hostname):
-    resolver = aiodns.DNSResolver()
     try:
-        result = await resolver.query(hostname, "A")
-        return result[0].host
-    except Exception as e:
-        return str(e)
+        return str(ipaddress.ip_address(hostname))  # Trackers given by IP address need no lookup
+    except ValueError:
+        pass
 
+    cached_ip = _cache_get(_DNS_CACHE, hostname, DNS_CACHE_TTL)
+    if cached_ip is not None:
+        return cached_ip
 
-async def send_udp_request(parsed_tracker, message, response_handler, error_handler, timeout):
     loop = asyncio.get_running_loop()
-    resolver = aiodns.DNSResolver(loop=loop)
-    try:
-        query = await resolver.query(parsed_tracker.hostname, "A")
-        ip = query[0].host
-    except Exception as e:
-        error_handler(f"DNS resolution failed for {parsed_tracker.geturl()} - {e}")
-        return
+    if _RESOLVER is None or _RESOLVER.loop is not loop:
+        stale_resolver, _RESOLVER = _RESOLVER, aiodns.DNSResolver(loop=loop)
+        if stale_resolver is not None:
+            # Release the c-ares channel left on the previous loop; close() only exists from aiodns 3.5
+            if hasattr(stale_resolver, "close"):
+                await stale_resolver.close()
+            else:
+                stale_resolver.cancel()
 
-    transport, protocol = await loop.create_datagram_endpoint(
-        lambda: UDPTrackerClientProtocol(message, response_handler, error_handler),
-        remote_addr=(ip, parsed_tracker.port),
-    )
+    query = await _RESOLVER.query(hostname, "A")
+    ip = query[0].host
+    _DNS_CACHE[hostname] = (ip, time.monotonic())
+    return ip
+
+
+async def resolve_hostname(hostname):
     try:
-        await asyncio.wait_for(asyncio.sleep(timeout), timeout=timeout)  # Timeout for response
-    except asyncio.TimeoutError:
-        error_handler(f"Timeout while waiting for response from {parsed_tracker.geturl()}")
-    finally:
-        if transport.is_closing():
-            transport.abort()
-        else:
-            try:
-                transport.close()
-            except RuntimeError:
-                pass
+        return await _resolve(hostname)
+    except Exception as e:
+        return str(e)
 
 
 def udp_create_connection_request():
@@ -202,86 +387,114 @@ def udp_create_connection_request():
     action = 0  # action (0 = give me a new connection id)
     transaction_id = random.randint(0, 0xFFFFFFFF)
     # Use 'II' for unsigned ints to handle the full range of possible transaction_ids
-    buf = struct.pack("!qII", connection_id, action, transaction_id)
+    buf = _REQUEST_HEADER.pack(connection_id, action, transaction_id)
     return buf, transaction_id
 
 
 def udp_create_scrape_request(connection_id, info_hashes):
     base_size = 16  # Basic overhead for connection ID, action, and transaction ID in bytes
     max_packet_size = 508  # Maximum safe UDP packet size in bytes
+    hash_size = 20  # Every info hash is a 20 byte SHA-1 digest
+    max_hashes = (max_packet_size - 2 * base_size) // hash_size
     action = 2  # Action code for 'scrape'
     transaction_id = random.randint(0, 0xFFFFFFFF)
 
-    # Start assembling the packet
-    packet = struct.pack("!qII", connection_id, action, transaction_id)
-    included_hashes = []
-
-    for info_hash in info_hashes:
-        hash_bytes = binascii.a2b_hex(info_hash)
-        # Check if adding this hash would exceed the max packet size considering base_size
-        if len(packet) + len(hash_bytes) + base_size > max_packet_size:
-            break  # Stop adding hashes if the packet would become too large
-        packet += hash_bytes
-        included_hashes.append(info_hash)
-
+    included_hashes = info_hashes[:max_hashes]
     if not included_hashes:
         raise ValueError("No hashes could be included in the packet without exceeding the size limit.")
 
+    packet = _REQUEST_HEADER.pack(connection_id, action, transaction_id) + b"".join(
+        bytes.fromhex(info_hash) for info_hash in included_hashes
+    )
     return packet, included_hashes, transaction_id
 
 
 async def scrape_udp(parsed_tracker: parse.ParseResult, info_hashes: list[str], timeout: int):
-    con_req, con_trans_id = udp_create_connection_request()
+    loop = asyncio.get_running_loop()
     results = {}
-    remaining_hashes = list(info_hashes)  # Start with all hashes
-
-    async def on_con_response(data):
-        action, trans_id, connection_id = struct.unpack_from("!IIq", data)
-        if action != 0 or trans_id != con_trans_id:
-            logging.error(f"Invalid connection response from {parsed_tracker.geturl()}")
-            return
-
-        nonlocal remaining_hashes  # Reference the non-local variable defined in outer scope
 
-        while remaining_hashes:
-            try:
-                scrape_req, included_hashes, trans_id = udp_create_scrape_request(connection_id, remaining_hashes)
-                remaining_hashes = [h for h in remaining_hashes if h not in included_hashes]  # Update remaining_hashes safely
-                await send_udp_request(parsed_tracker, scrape_req, lambda response: on_scrape_response(response, included_hashes, trans_id), on_error, timeout)
-            except ValueError as e:
-                logging.error(f"Error creating UDP scrape request: {e}")
-                break
+    def on_error(error_message):
+        logging.error(f"Error: {error_message}")
 
-    async def on_scrape_response(data, included_hashes, trans_id):
-        action, resp_trans_id = struct.unpack_from("!II", data)
+    def on_scrape_response(data, included_hashes, trans_id):
+        action, resp_trans_id = _RESPONSE_HEADER.unpack_from(data)
         if action != 2 or resp_trans_id != trans_id:
             logging.error(f"Invalid scrape response from {parsed_tracker.geturl()}")
+            _CONN_ID_CACHE.pop(tracker_addr, None)  # The connection ID may have been rejected
             return
 
-        offset = 8  # Skip action and transaction ID
-        expected_length_per_hash = 12  # 4 bytes each for seeds, completed, leeches
-        local_results = {}
-
-        for info_hash in included_hashes:
-            if offset + expected_length_per_hash > len(data):
-                logging.error(f"Not enough data to unpack results for hash: {info_hash}. Data: {data} Data length: {len(data)}, required: {offset + expected_length_per_hash}")
-                continue  # Use continue to process next hashes if possible
-
-            seeds, completed, leeches = struct.unpack_from("!iii", data, offset)
-            readable_hash = binascii.b2a_hex(binascii.a2b_hex(info_hash)).decode("utf-8")
-            local_results[readable_hash] = {
-                "tracker_url": parsed_tracker.geturl(),
+        expected_length_per_hash = _SCRAPE_STATS.size  # 4 bytes each for seeds, completed, leeches
+        payload = memoryview(data)[_RESPONSE_HEADER.size:]  # Skip action and transaction ID
+        available = len(payload) // expected_length_per_hash
+        if available < len(included_hashes):
+            logging.error(f"Not enough data to unpack results for hashes: {included_hashes[available:]}. Data: {data} Data length: {len(data)}, required: {_RESPONSE_HEADER.size + expected_length_per_hash * len(included_hashes)}")
+
+        tracker_url = parsed_tracker.geturl()
+        stats = _SCRAPE_STATS.iter_unpack(payload[:available * expected_length_per_hash])
+        for info_hash, (seeds, completed, leeches) in zip(included_hashes, stats):
+            results[info_hash.lower()] = {
+                "tracker_url": tracker_url,
                 "seeders": seeds,
                 "peers": leeches,
                 "complete": completed,
             }
-            offset += expected_length_per_hash
 
-        results.update(local_results)
+    try:
+        ip = await _resolve(parsed_tracker.hostname)
+    except Exception as e:
+        on_error(f"DNS resolution failed for {parsed_tracker.geturl()} - {e}")
+        return results
 
-    def on_error(error_message):
-        logging.error(f"Error: {error_message}")
+    tracker_addr = (ip, parsed_tracker.port)
+    deadline = loop.time() + timeout  # A single timeout covers the handshake and all scrape packets
+
+    # A single endpoint carries the connect handshake and every scrape packet
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: UDPTrackerClientProtocol(on_error),
+        remote_addr=tracker_addr,
+    )
+    try:
+        connection_id = _cache_get(_CONN_ID_CACHE, tracker_addr, CONNECTION_ID_TTL)  # Skips the connect handshake
+        if connection_id is None:
+            con_req, con_trans_id = udp_create_connection_request()
+            try:
+                data = await asyncio.wait_for(protocol.request(con_req, con_trans_id), timeout=deadline - loop.time())
+            except asyncio.TimeoutError:
+                on_error(f"Timeout while waiting for response from {parsed_tracker.geturl()}")
+                return results
+            except OSError:
+                return results  # Already reported through error_received
+
+            # Error replies (action 3) can be shorter than a connect response, so check before unpacking
+            action, trans_id = _RESPONSE_HEADER.unpack_from(data)
+            if action != 0 or trans_id != con_trans_id or len(data) < _CONNECT_RESPONSE.size:
+                logging.error(f"Invalid connection response from {parsed_tracker.geturl()}")
+                return results
+            _, _, connection_id = _CONNECT_RESPONSE.unpack_from(data)
+            _CONN_ID_CACHE[tracker_addr] = (connection_id, time.monotonic())
+
+        # Fire all scrape packets at once, each matched to its response by transaction ID
+        pending = {}
+        remaining_hashes = list(info_hashes)
+        while remaining_hashes:
+            try:
+                scrape_req, included_hashes, trans_id = udp_create_scrape_request(connection_id, remaining_hashes)
+            except ValueError as e:
+                logging.error(f"Error creating UDP scrape request: {e}")
+                break
+            remaining_hashes = remaining_hashes[len(included_hashes):]
+            pending[protocol.request(scrape_req, trans_id)] = (included_hashes, trans_id)
+
+        if not pending:
+            return results
+
+        done, not_done = await asyncio.wait(pending, timeout=max(deadline - loop.time(), 0))
+        if not_done:
+            on_error(f"Timeout while waiting for response from {parsed_tracker.geturl()}")
+        for future in done:
+            if not future.cancelled() and future.exception() is None:
+                on_scrape_response(future.result(), *pending[future])
+    finally:
+        transport.close()
 
-    # Perform the initial connection request
-    await send_udp_request(parsed_tracker, con_req, on_con_response, on_error, timeout)
     return results
@@ -1,3 +1,9 @@
+import asyncio
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
 
 def find_max_seeders(
     aggregated_results: dict[str, list[dict[str, int]]]
@@ -12,12 +18,28 @@ def find_max_seeders(
     Returns:
         dict[str, int]: A dictionary with info hashes as keys and the maximum number of seeders for each info hash as values.
     """
-    max_seeders = {}
+    return {
+        info_hash: max((result.get("seeders", 0) for result in results), default=0)
+        for info_hash, results in aggregated_results.items()
+    }
+
+
+def run(main: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine to completion on uvloop if it is installed, or on the default asyncio event loop otherwise.
 
-    for info_hash, results in aggregated_results.items():
-        max_seeder_count = max(
-            (result.get("seeders", 0) for result in results), default=0
-        )
-        max_seeders[info_hash] = max_seeder_count if max_seeder_count > 0 else 0
+    Use this in place of asyncio.run. uvloop is not available on Windows, in which case the default event
+    loop is used. The loop is created directly through uvloop.run, so no global event loop policy is changed.
+
+    Args:
+        main (Coroutine): The coroutine to run, e.g. main().
+
+    Returns:
+        The value returned by the coroutine.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(main)
 
-    return max_seeders
+    return uvloop.run(main)
@@ -1,5 +1,79 @@
+import asyncio
+import struct
+import time
+from contextlib import asynccontextmanager
+from urllib import parse
+
 import pytest
+from aiohttp import web
+
 from pyasynctracker import scrape_info_hashes, batch_scrape_info_hashes
+from pyasynctracker import scraper
+from pyasynctracker.scraper import udp_create_scrape_request
+
+
+def bencode_scrape_stats(complete, incomplete, downloaded):
+    return b"d8:completei%de10:downloadedi%de10:incompletei%dee" % (complete, downloaded, incomplete)
+
+
+@asynccontextmanager
+async def http_tracker(handler):
+    app = web.Application()
+    app.router.add_get("/scrape", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    try:
+        yield f"http://{host}:{port}/announce"
+    finally:
+        await runner.cleanup()
+
+
+class FakeUDPTracker(asyncio.DatagramProtocol):
+    """Minimal BEP 15 tracker answering every hash with 7 seeders, 8 completed and 3 leechers."""
+
+    def __init__(self):
+        self.transport = None
+        self.connects = 0
+        self.scrape_packets = 0
+        self.connect_error = False
+        self.scrape_error = False
+        self.drop_scrapes = False
+        self.connect_delay = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        _, action, trans_id = struct.unpack_from("!qII", data)
+        if action == 0:
+            self.connects += 1
+            if self.connect_error:
+                self.transport.sendto(struct.pack("!II", 3, trans_id) + b"no", addr)
+            else:
+                reply = struct.pack("!IIq", 0, trans_id, 0x1234)
+                asyncio.get_running_loop().call_later(self.connect_delay, self.transport.sendto, reply, addr)
+        elif action == 2:
+            self.scrape_packets += 1
+            if self.drop_scrapes:
+                return
+            if self.scrape_error:
+                self.transport.sendto(struct.pack("!II", 3, trans_id) + b"connection id expired", addr)
+                return
+            hash_count = (len(data) - 16) // 20
+            self.transport.sendto(struct.pack("!II", 2, trans_id) + struct.pack("!iii", 7, 8, 3) * hash_count, addr)
+
+
+@asynccontextmanager
+async def udp_tracker():
+    loop = asyncio.get_running_loop()
+    transport, tracker = await loop.create_datagram_endpoint(FakeUDPTracker, local_addr=("127.0.0.1", 0))
+    host, port = transport.get_extra_info("sockname")[:2]
+    try:
+        yield tracker, f"udp://{host}:{port}/announce"
+    finally:
+        transport.close()
 
 
 @pytest.mark.asyncio
@@ -26,3 +100,206 @@ async def test_batch_scrape_info_hashes():
     results = await batch_scrape_info_hashes(data_list)
     assert isinstance(results, dict)
     assert all(key in results for key, _ in data_list)
+
+
+def test_udp_create_scrape_request_limits_packet_size():
+    info_hashes = [f"{i:040x}" for i in range(30)]
+    packet, included_hashes, _ = udp_create_scrape_request(0x41727101980, info_hashes)
+    assert included_hashes == info_hashes[:23]
+    assert len(packet) == 16 + 20 * 23
+    assert packet[16:36] == bytes.fromhex(info_hashes[0])
+
+
+@pytest.mark.asyncio
+async def test_scrape_http_accepts_unsorted_response():
+    info_hashes = ["706440a3f8fdac91591d6007c4314f3274317f85", "2b66980093bc11806fab50cb3cb41835b95a0362"]
+
+    async def reversed_scrape(request):
+        requested = parse.parse_qs(request.query_string, encoding="latin-1")["info_hash"]
+        # Reply with the hashes in descending order, which is not canonical bencode
+        files = b"".join(
+            b"20:" + info_hash.encode("latin-1") + bencode_scrape_stats(5, 2, 9)
+            for info_hash in sorted(requested, reverse=True)
+        )
+        return web.Response(body=b"d5:filesd" + files + b"ee")
+
+    async with http_tracker(reversed_scrape) as tracker_url:
+        results = await scrape_info_hashes(info_hashes, [tracker_url])
+
+    assert set(results) == set(info_hashes)
+    for info_hash in info_hashes:
+        assert results[info_hash] == [{"tracker_url": tracker_url, "seeders": 5, "peers": 2, "complete": 9}]
+
+
+@pytest.mark.asyncio
+async def test_resolve_closes_resolver_from_previous_loop(monkeypatch):
+    class StaleResolver:
+        loop = None  # Never the running loop
+        closed = False
+
+        async def close(self):
+            self.closed = True
+
+    stale = StaleResolver()
+    monkeypatch.setattr(scraper, "_RESOLVER", stale)
+    await scraper.resolve_hostname("tracker.invalid")
+
+    assert stale.closed
+    assert scraper._RESOLVER is not stale
+    assert scraper._RESOLVER.loop is asyncio.get_running_loop()
+
+
+@pytest.mark.asyncio
+async def test_http_lookup_fills_udp_dns_cache(monkeypatch):
+    monkeypatch.setattr(scraper, "_DNS_CACHE", {})
+    info_hash = "2b66980093bc11806fab50cb3cb41835b95a0362"
+
+    async def scrape(request):
+        files = b"20:" + bytes.fromhex(info_hash) + bencode_scrape_stats(5, 2, 9)
+        return web.Response(body=b"d5:filesd" + files + b"ee")
+
+    async with http_tracker(scrape) as tracker_url, udp_tracker() as (tracker, udp_url):
+        http_url = tracker_url.replace("127.0.0.1", "localhost")
+        assert await scrape_info_hashes([info_hash], [http_url])
+        cached = scraper._DNS_CACHE["localhost"]
+        assert cached[0] == "127.0.0.1"
+
+        udp_url = udp_url.replace("127.0.0.1", "localhost")
+        results = await scrape_info_hashes([info_hash], [udp_url], timeout=2)
+
+    assert results[info_hash] == [{"tracker_url": udp_url, "seeders": 7, "peers": 3, "complete": 8}]
+    # The UDP scrape was answered from the entry the HTTP lookup left behind
+    assert scraper._DNS_CACHE["localhost"] is cached
+
+
+@pytest.mark.asyncio
+async def test_scrape_udp_splits_hashes_across_packets():
+    info_hashes = [f"{i:040x}" for i in range(1, 51)]
+
+    async with udp_tracker() as (tracker, tracker_url):
+        results = await scrape_info_hashes(info_hashes, [tracker_url], timeout=2)
+
+    assert tracker.scrape_packets == 3
+    assert set(results) == set(info_hashes)
+    assert results[info_hashes[-1]] == [{"tracker_url": tracker_url, "seeders": 7, "peers": 3, "complete": 8}]
+
+
+@pytest.mark.asyncio
+async def test_scrape_udp_reuses_connection_id():
+    info_hashes = ["2b66980093bc11806fab50cb3cb41835b95a0362"]
+
+    async with udp_tracker() as (tracker, tracker_url):
+        first = await scrape_info_hashes(info_hashes, [tracker_url], timeout=2)
+        second = await scrape_info_hashes(info_hashes, [tracker_url], timeout=2)
+
+    assert first == second
+    assert set(second) == set(info_hashes)
+    assert tracker.connects == 1
+    assert tracker.scrape_packets == 2
+
+
+@pytest.mark.asyncio
+async def test_scrape_udp_drops_connection_id_after_error_reply():
+    info_hashes = ["2b66980093bc11806fab50cb3cb41835b95a0362"]
+
+    async with udp_tracker() as (tracker, tracker_url):
+        tracker.scrape_error = True
+        assert await scrape_info_hashes(info_hashes, [tracker_url], timeout=2) == {}
+        tracker.scrape_error = False
+        results = await scrape_info_hashes(info_hashes, [tracker_url], timeout=2)
+
+    assert set(results) == set(info_hashes)
+    assert tracker.connects == 2
+
+
+@pytest.mark.asyncio
+async def test_scrape_udp_short_connect_error_reply():
+    async with udp_tracker() as (tracker, tracker_url):
+        tracker.connect_error = True
+        parsed = parse.urlparse(tracker_url)
+        results = await scraper.scrape_udp(parsed, ["2b66980093bc11806fab50cb3cb41835b95a0362"], timeout=2)
+
+    assert results == {}
+    assert tracker.connects == 1
+
+
+@pytest.mark.asyncio
+async def test_scrape_udp_timeout_is_not_multiplied():
+    info_hashes = [f"{i:040x}" for i in range(1, 51)]
+    timeout = 1
+
+    async with udp_tracker() as (tracker, tracker_url):
+        # The connect reply arrives just before the timeout and every scrape packet is dropped,
+        # so a separate timeout per step would take close to twice the timeout
+        tracker.connect_delay = timeout * 0.9
+        tracker.drop_scrapes = True
+        start = time.monotonic()
+        results = await scrape_info_hashes(info_hashes, [tracker_url], timeout=timeout)
+        elapsed = time.monotonic() - start
+
+    assert results == {}
+    assert tracker.scrape_packets == 3
+    assert elapsed < timeout * 1.75
+
+
+@pytest.mark.asyncio
+async def test_scrape_http_rejects_oversized_response(monkeypatch):
+    monkeypatch.setattr(scraper, "MAX_HTTP_RESPONSE_SIZE", 1024)
+    info_hash = "2b66980093bc11806fab50cb3cb41835b95a0362"
+    files = b"20:" + bytes.fromhex(info_hash) + bencode_scrape_stats(5, 2, 9)
+    padding = b"".join(b"20:" + bytes([0xff, i]) * 10 + bencode_scrape_stats(0, 0, 0) for i in range(40))
+    body = b"d5:filesd" + files + padding + b"ee"
+    assert len(body) > 1024
+
+    async def large_scrape(request):
+        response = web.StreamResponse()  # Chunked, so the size is only known while reading
+        await response.prepare(request)
+        await response.write(body)
+        return response
+
+    async with http_tracker(large_scrape) as tracker_url:
+        assert await scrape_info_hashes([info_hash], [tracker_url]) == {}
+
+    monkeypatch.setattr(scraper, "MAX_HTTP_RESPONSE_SIZE", len(body))
+    async with http_tracker(large_scrape) as tracker_url:
+        results = await scrape_info_hashes([info_hash], [tracker_url])
+    assert results[info_hash] == [{"tracker_url": tracker_url, "seeders": 5, "peers": 2, "complete": 9}]
+
+
+@pytest.mark.asyncio
+async def test_scrape_tracker_limits_concurrent_scrapes_per_host(monkeypatch):
+    monkeypatch.setattr(scraper, "MAX_CONNECTIONS_PER_HOST", 3)
+    monkeypatch.setattr(scraper, "_CONN_ID_CACHE", {})
+    running = peak = 0
+    scrape_udp = scraper.scrape_udp
+
+    async def counting_scrape_udp(*args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            return await scrape_udp(*args)
+        finally:
+            running -= 1
+
+    monkeypatch.setattr(scraper, "scrape_udp", counting_scrape_udp)
+    info_hashes = ["2b66980093bc11806fab50cb3cb41835b95a0362"]
+
+    async with udp_tracker() as (tracker, tracker_url):
+        tracker.connect_delay = 0.05  # Keep each scrape in flight long enough to overlap
+        results = await asyncio.gather(
+            *(scraper.scrape_tracker(tracker_url, info_hashes, timeout=2) for _ in range(10))
+        )
+
+    assert all(set(result) == set(info_hashes) for result in results)
+    assert peak == 3
+    assert not scraper._HOST_SEMAPHORES
+
+
+def test_cache_get_evicts_expired_entries():
+    cache = {"fresh": ("1.2.3.4", time.monotonic()), "stale": ("5.6.7.8", time.monotonic() - 10)}
+
+    assert scraper._cache_get(cache, "fresh", 5) == "1.2.3.4"
+    assert scraper._cache_get(cache, "stale", 5) is None
+    assert scraper._cache_get(cache, "missing", 5) is None
+    assert set(cache) == {"fresh"}
@@ -1,4 +1,9 @@
-from pyasynctracker import find_max_seeders
+import asyncio
+import sys
+
+import pytest
+
+from pyasynctracker import find_max_seeders, run
 
 
 def test_find_max_seeders():
@@ -9,3 +14,21 @@ def test_find_max_seeders():
     }
     max_seeders = find_max_seeders(results)
     assert max_seeders['2b66980093bc11806fab50cb3cb41835b95a0362'] == 1022
+
+
+async def running_loop():
+    return asyncio.get_running_loop()
+
+
+def test_run_without_uvloop(monkeypatch):
+    monkeypatch.setitem(sys.modules, "uvloop", None)
+    loop = run(running_loop())
+    assert isinstance(loop, asyncio.AbstractEventLoop)
+    assert loop.is_closed()
+
+
+def test_run_with_uvloop():
+    uvloop = pytest.importorskip("uvloop")
+    policy = asyncio.get_event_loop_policy()
+    assert isinstance(run(running_loop()), uvloop.Loop)
+    assert asyncio.get_event_loop_policy() is policy